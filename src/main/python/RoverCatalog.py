@@ -0,0 +1,190 @@
+import mmap
+import os
+import struct
+
+from bisect import bisect_left
+from bisect import bisect_right
+from heapq import merge
+
+from RoverImage import Chunk
+
+class ChunkCatalog(object):
+    '''
+    an on-disk catalog of the chunks of many images, opened read-only through
+    mmap so any number of processes can share it. Chunks are stored as
+    (image, start, end) records sorted in the order ImageFactory.sortChunks
+    produces, so the chunks of one image are found with a binary search and
+    handed to a solver without any parsing or sorting.
+
+    Appends write a new sorted run to the end of the file, first cutting off
+    any run left incomplete by an interrupted append; lookups search every run
+    and merge the results, and compact() folds the runs back into one. There
+    should only ever be one writer at a time
+    '''
+    _MAGIC_      = b'RVRCAT01'
+    _RUN_HEADER_ = struct.Struct('<Q')
+    _RECORD_     = struct.Struct('<qqq')
+
+    def __init__(self, catalogFile, catalogMap, runs):
+        self.catalogFile = catalogFile
+        self.catalogMap = catalogMap
+
+        # (offset of the first record, number of records) for each run
+        self.runs = runs
+
+    def create(catalogPath, imageChunks={}):
+        tmpPath = '%s.tmp' % catalogPath
+
+        with open(tmpPath, 'wb') as catalogFile:
+            catalogFile.write(ChunkCatalog._MAGIC_)
+            ChunkCatalog.writeRun(catalogFile, ChunkCatalog.toRecords(imageChunks))
+
+        # readers holding the old catalog keep their mapping of it
+        os.replace(tmpPath, catalogPath)
+
+    def append(catalogPath, imageChunks):
+        if (not os.path.exists(catalogPath)):
+            ChunkCatalog.create(catalogPath, imageChunks)
+            return
+
+        with open(catalogPath, 'r+b') as catalogFile:
+            # an interrupted append leaves a partial run behind, which has to
+            # go before a new run is written or readers would parse the new
+            # records as part of it
+            catalogFile.seek(ChunkCatalog.completeLength(catalogPath, catalogFile))
+            catalogFile.truncate()
+
+            ChunkCatalog.writeRun(catalogFile, ChunkCatalog.toRecords(imageChunks))
+
+    def completeLength(catalogPath, catalogFile):
+        catalogMap = ChunkCatalog.mapCatalog(catalogPath, catalogFile)
+
+        try:
+            runs = ChunkCatalog.findRuns(catalogMap)
+        finally:
+            catalogMap.close()
+
+        if (len(runs) == 0):
+            return len(ChunkCatalog._MAGIC_)
+
+        (recordOffset, numRecords) = runs[-1]
+        return recordOffset + numRecords * ChunkCatalog._RECORD_.size
+
+    def compact(catalogPath):
+        catalog = ChunkCatalog.open(catalogPath)
+        imageChunks = {}
+
+        try:
+            for (imageId, startByte, endByte) in catalog.records():
+                imageChunks.setdefault(imageId, []).append(Chunk(startByte, endByte))
+        finally:
+            catalog.close()
+
+        ChunkCatalog.create(catalogPath, imageChunks)
+
+    def toRecords(imageChunks):
+        return sorted((imageId, chunk.start(), chunk.end())
+                      for (imageId, chunks) in imageChunks.items()
+                      for chunk in chunks)
+
+    def writeRun(catalogFile, records):
+        runBytes = bytearray(ChunkCatalog._RUN_HEADER_.pack(len(records)))
+
+        for record in records:
+            runBytes += ChunkCatalog._RECORD_.pack(*record)
+
+        catalogFile.write(runBytes)
+        catalogFile.flush()
+        os.fsync(catalogFile.fileno())
+
+    def open(catalogPath):
+        catalogFile = open(catalogPath, 'rb')
+
+        try:
+            catalogMap = ChunkCatalog.mapCatalog(catalogPath, catalogFile)
+        except Exception:
+            catalogFile.close()
+            raise
+
+        return ChunkCatalog(catalogFile, catalogMap,
+                            ChunkCatalog.findRuns(catalogMap))
+
+    def mapCatalog(catalogPath, catalogFile):
+        # mmap refuses empty files, which are no more a catalog than a file
+        # with the wrong magic
+        if (os.fstat(catalogFile.fileno()).st_size < len(ChunkCatalog._MAGIC_)):
+            raise ValueError('[%s] is not a chunk catalog' % catalogPath)
+
+        catalogMap = mmap.mmap(catalogFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if (catalogMap[:len(ChunkCatalog._MAGIC_)] != ChunkCatalog._MAGIC_):
+            catalogMap.close()
+            raise ValueError('[%s] is not a chunk catalog' % catalogPath)
+
+        return catalogMap
+
+    def findRuns(catalogMap):
+        runs = []
+        runOffset = len(ChunkCatalog._MAGIC_)
+
+        while (runOffset + ChunkCatalog._RUN_HEADER_.size <= len(catalogMap)):
+            (numRecords,) = ChunkCatalog._RUN_HEADER_.unpack_from(catalogMap,
+                                                                  runOffset)
+            recordOffset = runOffset + ChunkCatalog._RUN_HEADER_.size
+            runOffset = recordOffset + numRecords * ChunkCatalog._RECORD_.size
+
+            # a run still being appended is ignored until it is complete
+            if (runOffset > len(catalogMap)):
+                break
+
+            runs.append((recordOffset, numRecords))
+
+        return runs
+
+    def close(self):
+        self.catalogMap.close()
+        self.catalogFile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def imageIdAt(self, recordOffset, recordNdx):
+        return ChunkCatalog._RECORD_.unpack_from(
+            self.catalogMap, recordOffset + recordNdx * ChunkCatalog._RECORD_.size
+        )[0]
+
+    def runRecords(self, recordOffset, startNdx, endNdx):
+        recordSize = ChunkCatalog._RECORD_.size
+
+        return ChunkCatalog._RECORD_.iter_unpack(
+            self.catalogMap[recordOffset + startNdx * recordSize:
+                            recordOffset + endNdx * recordSize]
+        )
+
+    def records(self):
+        return merge(*[self.runRecords(recordOffset, 0, numRecords)
+                       for (recordOffset, numRecords) in self.runs])
+
+    def imageChunks(self, imageId):
+        # O(log n + k) per run: two binary searches on the image id, then a
+        # slice of the matching records
+        runSlices = []
+
+        for (recordOffset, numRecords) in self.runs:
+            imageIdAt = lambda recordNdx: self.imageIdAt(recordOffset, recordNdx)
+
+            startNdx = bisect_left(range(numRecords), imageId, key=imageIdAt)
+            endNdx = bisect_right(range(numRecords), imageId, lo=startNdx,
+                                  key=imageIdAt)
+
+            if (startNdx < endNdx):
+                runSlices.append(self.runRecords(recordOffset, startNdx, endNdx))
+
+        return [Chunk(startByte, endByte)
+                for (recordImageId, startByte, endByte) in merge(*runSlices)]
+
+    def imageIds(self):
+        return sorted(set(record[0] for record in self.records()))
@@ -1,11 +1,134 @@
+from fractions import Fraction
+from math import lcm
+
 _BYTE_COUNT_KEY_  = 'numBytes'
 _LATENCY_KEY_     = 'latency'
 _BANDWIDTH_KEY_   = 'bandwidth'
 _CHUNK_COUNT_KEY_ = 'numChunks'
 
+class CostModel(object):
+    '''
+    prices chunks for the solver. Download costs are download times scaled by
+    dlCostScale(), chosen so that every cost is an integer and sums and
+    comparisons are exact regardless of summation order. Only convert to a
+    time for output
+    '''
+    def getDlCost(self, chunk):
+        raise NotImplementedError()
+
+    def getDlCosts(self, chunks):
+        return [self.getDlCost(chunk) for chunk in chunks]
+
+    def dlCostScale(self):
+        raise NotImplementedError()
+
+    def dlCostToTime(self, dlCost):
+        return CostModel.scaledToTime(dlCost, self.dlCostScale())
+
+    def scaledToTime(dlCost, dlCostScale):
+        return float(dlCost / dlCostScale)
+
+    def getDlTime(self, chunk):
+        return self.dlCostToTime(self.getDlCost(chunk))
+
+class UniformCostModel(CostModel):
+    '''
+    one latency and one bandwidth for every chunk, the cost model of the
+    original problem
+    '''
+    def __init__(self, latency, bandwidth):
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+    def getDlCost(self, chunk):
+        return (2 * self.latency * self.bandwidth) + chunk.size()
+
+    def dlCostScale(self):
+        return self.bandwidth
+
+class Tier(object):
+    '''
+    a rover storage tier. The retry multiplier is the expected number of
+    attempts per chunk, and is kept as an exact fraction so 1.25 is 5/4
+    '''
+    def __init__(self, latency, bandwidth, retryMultiplier=1):
+        # costs are only exact integers when latency and bandwidth are, so
+        # whole floats such as 10.0 are accepted as ints and anything else is
+        # rejected
+        for (name, value) in (('latency', latency), ('bandwidth', bandwidth)):
+            if (value != int(value)):
+                raise ValueError('tier %s must be a whole number, not [%s]' %
+                                 (name, value))
+
+        self.latency = int(latency)
+        self.bandwidth = int(bandwidth)
+        self.retryMultiplier = Fraction(str(retryMultiplier))
+
+        if (bandwidth <= 0):
+            raise ValueError('tier bandwidth must be positive, not [%s]' % bandwidth)
+
+        if (self.retryMultiplier < 1):
+            raise ValueError('tier retry multiplier must be at least 1, not [%s]' %
+                             retryMultiplier)
+
+    def unscaledCost(self, chunk):
+        # the download time scaled by this tier's bandwidth
+        return (2 * self.latency * self.bandwidth) + chunk.size()
+
+class TieredCostModel(CostModel):
+    '''
+    chunks served from different storage tiers. tierOf maps a chunk to the
+    name of its tier, either as a function or as a dict keyed by (start, end)
+    bytes; chunks it doesn't know about are served from the default tier
+    '''
+    def __init__(self, tiers, tierOf, defaultTier=None):
+        self.tiers = tiers
+        self.tierOf = tierOf
+        self.defaultTier = defaultTier
+
+        # scaling every tier to a common denominator keeps costs integral
+        self.costScale = lcm(*[tier.bandwidth * tier.retryMultiplier.denominator
+                               for tier in tiers.values()])
+        self.costFactors = dict(
+            (name, tier.retryMultiplier.numerator * self.costScale //
+                   (tier.bandwidth * tier.retryMultiplier.denominator))
+            for (name, tier) in tiers.items()
+        )
+
+    def tierName(self, chunk):
+        if (callable(self.tierOf)):
+            tierName = self.tierOf(chunk)
+        else:
+            tierName = self.tierOf.get((chunk.start(), chunk.end()), self.defaultTier)
+
+        if (tierName not in self.tiers):
+            raise ValueError('chunk %s has no known tier (got [%s])' %
+                             (chunk, tierName))
+
+        return tierName
+
+    def getDlCost(self, chunk):
+        return self.getDlCosts([chunk])[0]
+
+    def getDlCosts(self, chunks):
+        # one pass over the chunks with the per tier factors worked out up
+        # front, rather than one cost model lookup per chunk and segment
+        tiers = self.tiers
+        costFactors = self.costFactors
+        tierNames = [self.tierName(chunk) for chunk in chunks]
+
+        return [costFactors[name] * tiers[name].unscaledCost(chunk)
+                for (name, chunk) in zip(tierNames, chunks)]
+
+    def dlCostScale(self):
+        return self.costScale
+
 class ConnInfo(object):
-    def __init__(self, paramDict):
+    def __init__(self, paramDict, costModel=None):
         self.paramInfo = paramDict
+        self.costModel = costModel or UniformCostModel(
+            paramDict[_LATENCY_KEY_], paramDict[_BANDWIDTH_KEY_]
+        )
 
     def __str__(self):
         print(self.paramsToStr())
@@ -23,8 +146,19 @@ class ConnInfo(object):
         return self.paramInfo[_CHUNK_COUNT_KEY_]
 
     def getDlTime(self, chunk):
-        return float((2 * self.paramInfo[_LATENCY_KEY_]) +
-                     (chunk.size() / self.paramInfo[_BANDWIDTH_KEY_]))
+        return self.costModel.getDlTime(chunk)
+
+    def getDlCost(self, chunk):
+        return self.costModel.getDlCost(chunk)
+
+    def getDlCosts(self, chunks):
+        return self.costModel.getDlCosts(chunks)
+
+    def dlCostScale(self):
+        return self.costModel.dlCostScale()
+
+    def dlCostToTime(self, dlCost):
+        return self.costModel.dlCostToTime(dlCost)
 
     def paramsToStr(self):
         paramsAsStr = ''
@@ -42,10 +176,10 @@ class ConnectionFactory(object):
     _CONTEXT_PARAMS_ = (_BYTE_COUNT_KEY_, _LATENCY_KEY_,
                         _BANDWIDTH_KEY_, _CHUNK_COUNT_KEY_)
 
-    def connInfoFromStdIn():
+    def connInfoFromStdIn(costModel=None):
         connParams = {}
 
         for param in ConnectionFactory._CONTEXT_PARAMS_:
             connParams[param] = int(input())
 
-        return ConnInfo(connParams)
+        return ConnInfo(connParams, costModel)
@@ -1,4 +1,13 @@
+import sys
+
+from bisect import bisect_left
+from bisect import bisect_right
+from bisect import insort
 from copy import deepcopy
+from fractions import Fraction
+from heapq import heappop
+from heapq import heappush
+from heapq import merge
 
 class RoverImage(object):
     def __init__(self, chunks):
@@ -6,6 +15,11 @@ class RoverImage(object):
         self.segments = [Segment()]
         self.optimalSegment = None
 
+        # chunks paired with their download cost, priced in one pass per
+        # connection rather than once per segment and chunk
+        self.pricedChunks = None
+        self.pricedConnInfo = None
+
     '''
     the workhorse method for solving the mars rover image reconstruction
     problem
@@ -15,17 +29,34 @@ class RoverImage(object):
             self.extendSegments(connInfo)
             self.checkForOptimalSegment(connInfo)
 
-        return self.optimalSegment
+        return self.timedOptimalSegment(connInfo)
+
+    def timedOptimalSegment(self, connInfo):
+        if (self.optimalSegment is None):
+            return None
+
+        return self.optimalSegment.timed(connInfo)
+
+    def orderedChunks(self):
+        return self.chunks
+
+    def priceChunks(self, connInfo):
+        if (self.pricedConnInfo is not connInfo):
+            orderedChunks = self.orderedChunks()
+            self.pricedChunks = list(zip(orderedChunks,
+                                         connInfo.getDlCosts(orderedChunks)))
+            self.pricedConnInfo = connInfo
+
+        return self.pricedChunks
 
     def extendSegments(self, connInfo):
         extendedSegments = []
+        pricedChunks = self.priceChunks(connInfo)
 
         for segment in self.segments:
-            for chunk in self.chunks:
+            for (chunk, dlCost) in pricedChunks:
                 if (segment.isDiscoverable(chunk)):
-                    extendedSegments.append(Segment.extend(
-                        segment, chunk, connInfo.getDlTime(chunk)
-                    ))
+                    extendedSegments.append(Segment.extend(segment, chunk, dlCost))
 
         # once all segments have been extended, we throw away the old queue of
         # segments and continue computation with only the extended segments
@@ -37,17 +68,321 @@ class RoverImage(object):
         for segment in self.segments:
             if (segment.size() == connInfo.imageSize()):
                 if (self.optimalSegment is None or
-                    segment.dlTime < self.optimalSegment.dlTime):
+                    segment.dlCost < self.optimalSegment.dlCost):
                     self.optimalSegment = segment
 
             elif (self.optimalSegment is None or
-                  segment.dlTime <= self.optimalSegment.dlTime):
+                  segment.dlCost <= self.optimalSegment.dlCost):
                 potentialSegments.append(segment)
 
         # all extended segments are either pruned or maintained as potentially
         # optimal segments. We throw away the old queue of segments
         self.segments = potentialSegments
 
+class BeamRoverImage(RoverImage):
+    '''
+    the exhaustive search with a bounded frontier, for manifests dense enough
+    that RoverImage would run out of memory. Segments are extended one at a
+    time into the frontier, and whenever it holds more than maxSegments
+    segments or more than maxBytes bytes the segments with the highest cost per
+    covered byte are dropped. The result is provably optimal when nothing
+    cheaper than it was ever dropped, see isOptimal
+    '''
+    def __init__(self, chunks, maxSegments=None, maxBytes=None):
+        super(BeamRoverImage, self).__init__(chunks)
+
+        if (maxSegments is None and maxBytes is None):
+            raise ValueError('a beam needs a maximum number of segments or bytes')
+
+        self.maxSegments = maxSegments
+        self.maxBytes = maxBytes
+
+        # the cost of the cheapest segment dropped from the frontier so far
+        self.cheapestDropped = None
+
+    def isOptimal(self):
+        if (self.cheapestDropped is None):
+            return True
+
+        return (self.optimalSegment is not None and
+                self.cheapestDropped >= self.optimalSegment.dlCost)
+
+    def extendSegments(self, connInfo):
+        # a heap with the least promising segment on top
+        frontier = []
+        frontierBytes = 0
+        numExtended = 0
+
+        for segment in self.segments:
+            for (chunk, dlCost) in self.priceChunks(connInfo):
+                # chunks that don't carry the segment any further, such as empty
+                # chunks at byte 0, only add cost and have no cost per byte
+                if (not segment.isDiscoverable(chunk) or chunk.end() <= segment.end()):
+                    continue
+
+                extendedSegment = Segment.extend(segment, chunk, dlCost)
+
+                # segments that would be pruned anyway never enter the frontier
+                if (self.optimalSegment is not None and
+                    extendedSegment.dlCost > self.optimalSegment.dlCost):
+                    continue
+
+                # finished segments can't be extended, so they bypass the beam
+                if (extendedSegment.size() == connInfo.imageSize()):
+                    self.checkFinishedSegment(extendedSegment)
+                    continue
+
+                segmentBytes = BeamRoverImage.segmentBytes(extendedSegment)
+                heappush(frontier, (-Fraction(extendedSegment.dlCost,
+                                              extendedSegment.size()),
+                                    -numExtended, segmentBytes, extendedSegment))
+                frontierBytes += segmentBytes
+                numExtended += 1
+
+                while (len(frontier) > 0 and self.isOverBudget(frontier, frontierBytes)):
+                    (rank, order, droppedBytes, droppedSegment) = heappop(frontier)
+                    frontierBytes -= droppedBytes
+                    self.dropSegment(droppedSegment)
+
+        self.segments = [entry[-1] for entry in frontier]
+
+    def checkFinishedSegment(self, segment):
+        if (self.optimalSegment is None or
+            segment.dlCost < self.optimalSegment.dlCost):
+            self.optimalSegment = segment
+
+    def isOverBudget(self, frontier, frontierBytes):
+        return ((self.maxSegments is not None and len(frontier) > self.maxSegments) or
+                (self.maxBytes is not None and frontierBytes > self.maxBytes))
+
+    def dropSegment(self, segment):
+        if (self.cheapestDropped is None or segment.dlCost < self.cheapestDropped):
+            self.cheapestDropped = segment.dlCost
+
+    def segmentBytes(segment):
+        # chunks are copied into every segment that extends them, so they
+        # count towards the segment that holds them
+        return (sys.getsizeof(segment) + sys.getsizeof(segment.__dict__) +
+                sys.getsizeof(segment.chunks) +
+                sum(sys.getsizeof(chunk) + sys.getsizeof(chunk.__dict__)
+                    for chunk in segment.chunks))
+
+class DynamicRoverImage(RoverImage):
+    '''
+    solves the same problem as RoverImage, but relaxes byte offsets in order of
+    chunk end so that the cheapest segment ending at each offset is computed
+    exactly once instead of enumerating every chain of chunks
+    '''
+    def __init__(self, chunks):
+        super(DynamicRoverImage, self).__init__(chunks)
+
+        # the search with nothing received, relaxed through the priced chunks
+        # only as far as a solve or resume has needed so far. It keeps the
+        # cheapest segment ending at every offset it has reached
+        self.coldConnInfo = None
+        self.coldOffsets = None
+        self.coldSegments = None
+        self.numColdChunks = 0
+
+    def getOptimalImageSegment(self, connInfo):
+        self.advanceColdSearch(connInfo, connInfo.imageSize())
+        self.optimalSegment = self.imageSegment(connInfo, self.coldSegments)
+
+        return self.timedOptimalSegment(connInfo)
+
+    def getResumeImageSegment(self, connInfo, receivedRanges):
+        '''
+        plans only the bytes that have not been received yet. Received byte
+        ranges are treated as free chunks, and chunks lying entirely within a
+        received range are dropped since they cannot add anything. The plan
+        returned only holds the chunks that still need downloading.
+
+        Nothing before the first received byte differs from a cold solve, so
+        the search up to there is taken from the cold search this engine
+        keeps, and only chunks ending after it are relaxed again. Resuming
+        the same engine repeatedly, or after a solve, only pays for the part of
+        the image from the first received byte on
+        '''
+        # bytes past either end of the image are of no use to the plan
+        receivedChunks = ReceivedChunk.coalesce(
+            (max(startByte, 0), min(endByte, connInfo.imageSize()))
+            for (startByte, endByte) in receivedRanges
+        )
+        receivedStarts = [chunk.start() for chunk in receivedChunks]
+
+        firstReceived = connInfo.imageSize()
+        if (len(receivedChunks) > 0):
+            firstReceived = receivedChunks[0].start()
+
+        self.advanceColdSearch(connInfo, firstReceived)
+        offsets = self.coldOffsets[:bisect_right(self.coldOffsets, firstReceived)]
+        bestSegments = dict((offset, self.coldSegments[offset]) for offset in offsets)
+
+        pricedChunks = self.priceChunks(connInfo)
+        missingChunks = []
+
+        for (chunk, dlCost) in pricedChunks[self.numChunksEndingBy(connInfo,
+                                                                   firstReceived):]:
+            receivedNdx = bisect_right(receivedStarts, chunk.start()) - 1
+
+            if (receivedNdx < 0 or
+                receivedChunks[receivedNdx].end() < chunk.end()):
+                missingChunks.append((chunk, dlCost))
+
+        self.relaxChunks(merge(
+            missingChunks, [(chunk, 0) for chunk in receivedChunks],
+            key=lambda pricedChunk: pricedChunk[0].end()
+        ), offsets, bestSegments)
+
+        segment = self.imageSegment(connInfo, bestSegments)
+
+        if (segment is None):
+            return None
+
+        return Segment(segment.start(), segment.end(), segment.dlCost,
+                       [chunk for chunk in segment.chunks
+                        if not isinstance(chunk, ReceivedChunk)]).timed(connInfo)
+
+    def orderedChunks(self):
+        # the priced chunk table is kept in order of chunk end, so resumed
+        # transfers skip the sort as well as the pricing
+        return sorted(self.chunks, key=lambda chunk: chunk.end())
+
+    def numChunksEndingBy(self, connInfo, endByte):
+        return bisect_right(self.priceChunks(connInfo), endByte,
+                            key=lambda pricedChunk: pricedChunk[0].end())
+
+    def advanceColdSearch(self, connInfo, endByte):
+        # an offset is only ever written by chunks ending at it, so once every
+        # chunk ending by endByte is relaxed the offsets up to endByte are final
+        if (self.coldConnInfo is not connInfo):
+            self.coldConnInfo = connInfo
+            self.coldOffsets = [0]
+            self.coldSegments = {0: self.emptySegment(connInfo)}
+            self.numColdChunks = 0
+
+        numChunks = self.numChunksEndingBy(connInfo, endByte)
+
+        if (numChunks > self.numColdChunks):
+            self.relaxChunks(self.priceChunks(connInfo)[self.numColdChunks:numChunks],
+                             self.coldOffsets, self.coldSegments)
+            self.numColdChunks = numChunks
+
+    def imageSegment(self, connInfo, bestSegments):
+        self.segments = []
+
+        if (connInfo.imageSize() > 0):
+            return bestSegments.get(connInfo.imageSize())
+
+        return None
+
+    def relaxChunks(self, pricedChunks, offsets, bestSegments):
+        for (chunk, dlCost) in pricedChunks:
+            bestSegment = self.cheapestPrefix(offsets, bestSegments, chunk, dlCost)
+
+            if (bestSegment is None):
+                continue
+
+            extendedSegment = self.extendSegment(bestSegment, chunk, dlCost)
+            currentSegment = bestSegments.get(chunk.end())
+
+            if (currentSegment is None):
+                insort(offsets, chunk.end())
+                bestSegments[chunk.end()] = extendedSegment
+
+            elif (self.segmentKey(extendedSegment) <
+                  self.segmentKey(currentSegment)):
+                bestSegments[chunk.end()] = extendedSegment
+
+    def cheapestPrefix(self, offsets, bestSegments, chunk, dlCost):
+        # every offset before the end of this chunk is final, since chunks are
+        # visited in order of their end byte
+        startNdx = bisect_left(offsets, chunk.start())
+        endNdx = bisect_left(offsets, chunk.end())
+        (cheapestSegment, cheapestKey) = (None, None)
+
+        for offset in offsets[startNdx:endNdx]:
+            segment = bestSegments[offset]
+
+            if (self.isDiscoverable(segment, chunk)):
+                extensionKey = self.extensionKey(segment, chunk, dlCost)
+
+                if (cheapestSegment is None or extensionKey < cheapestKey):
+                    (cheapestSegment, cheapestKey) = (segment, extensionKey)
+
+        return cheapestSegment
+
+    # the methods below define the objective. Keys of segments that end at the
+    # same offset are compared, smaller being better
+    def emptySegment(self, connInfo):
+        return Segment()
+
+    def isDiscoverable(self, segment, chunk):
+        return segment.isDiscoverable(chunk)
+
+    def extendSegment(self, segment, chunk, dlCost):
+        return Segment.extend(segment, chunk, dlCost)
+
+    def segmentKey(self, segment):
+        return segment.dlCost
+
+    def extensionKey(self, segment, chunk, dlCost):
+        return segment.addCost(dlCost)
+
+class ProgressiveRoverImage(DynamicRoverImage):
+    '''
+    orders downloads so that decoders can start on a contiguous prefix of the
+    image. Given byte milestones, the time at which the first milestone bytes
+    are available is minimised first, then the second, and so on; the full
+    image is always the final milestone. Chunks are assumed to be downloaded
+    one after another in plan order
+    '''
+    def __init__(self, chunks, milestones):
+        super(ProgressiveRoverImage, self).__init__(chunks)
+
+        if (isinstance(milestones, int)):
+            milestones = [milestones]
+
+        self.milestones = sorted(set(milestones))
+
+    def getOptimalImageSegment(self, connInfo):
+        for milestone in self.milestones:
+            if (milestone <= 0 or milestone > connInfo.imageSize()):
+                raise ValueError('milestone [%d] is outside of the image' %
+                                 milestone)
+
+        return super(ProgressiveRoverImage, self).getOptimalImageSegment(connInfo)
+
+    def emptySegment(self, connInfo):
+        milestones = list(self.milestones)
+
+        if (len(milestones) == 0 or milestones[-1] != connInfo.imageSize()):
+            milestones.append(connInfo.imageSize())
+
+        return ProgressiveSegment(milestones=milestones)
+
+    def extendSegment(self, segment, chunk, dlCost):
+        return ProgressiveSegment.extend(segment, chunk, dlCost)
+
+    def isDiscoverable(self, segment, chunk):
+        # unlike the total time, the milestone times can improve by fetching a
+        # small chunk at byte 0 before a larger one that also starts there, so
+        # any chunk that carries the segment further may follow it
+        return chunk.start() <= segment.end() < chunk.end()
+
+    def segmentKey(self, segment):
+        return ProgressiveRoverImage.arrivalKey(segment.arrivals, segment.dlCost)
+
+    def extensionKey(self, segment, chunk, dlCost):
+        extendedCost = segment.addCost(dlCost)
+
+        return ProgressiveRoverImage.arrivalKey(
+            segment.arrivalsAfter(chunk, extendedCost), extendedCost
+        )
+
+    def arrivalKey(arrivals, dlCost):
+        return tuple(arrival for (milestone, arrival) in arrivals) + (dlCost,)
+
 class Chunk(object):
     def __init__(self, startByte, endByte):
         self.startByte = startByte
@@ -80,25 +415,54 @@ class Chunk(object):
     def __str__(self):
         return '[%d, %d]' % (self.start(), self.end())
 
+class ReceivedChunk(Chunk):
+    '''
+    a byte range that is already on the ground and costs nothing to use
+    '''
+    def coalesce(byteRanges):
+        receivedChunks = []
+
+        for (startByte, endByte) in sorted(byteRanges):
+            if (endByte <= startByte):
+                continue
+
+            if (len(receivedChunks) > 0 and
+                receivedChunks[-1].isOverlapping(Chunk(startByte, endByte))):
+                receivedChunks[-1].end(max(receivedChunks[-1].end(), endByte))
+            else:
+                receivedChunks.append(ReceivedChunk(startByte, endByte))
+
+        return receivedChunks
+
 class Segment(Chunk):
-    def __init__(self, startByte=0, endByte=0, dlTime=0, chunks=[]):
+    '''
+    a chain of chunks starting at the first byte of the image. Engines search
+    on dlCost, the exact integer cost from ConnInfo.getDlCost; dlTime is only
+    filled in, by timed(), on the segment handed back to callers
+    '''
+    def __init__(self, startByte=0, endByte=0, dlCost=0, chunks=[], dlTime=None):
         super(Segment, self).__init__(startByte, endByte)
 
+        self.dlCost = dlCost
         self.dlTime = dlTime
         self.chunks = chunks
 
-    def addTime(self, addTime):
-        return self.dlTime + addTime
+    def addCost(self, addCost):
+        return self.dlCost + addCost
 
     def isDiscoverable(self, chunk):
         return (self.end() == chunk.start() or
                (self.isOverlapping(chunk) and self.isShifted(chunk)))
 
-    def extend(segment, chunk, dlTime):
+    def extend(segment, chunk, dlCost):
         chunkSeq = deepcopy(segment.chunks)
         chunkSeq.append(chunk)
 
-        return Segment(segment.start(), chunk.end(), segment.addTime(dlTime), chunkSeq)
+        return Segment(segment.start(), chunk.end(), segment.addCost(dlCost), chunkSeq)
+
+    def timed(self, connInfo):
+        return Segment(self.start(), self.end(), self.dlCost, self.chunks,
+                       connInfo.dlCostToTime(self.dlCost))
 
     def __str__(self):
         chunkStrList = []
@@ -108,13 +472,78 @@ class Segment(Chunk):
 
         return ','.join(chunkStrList)
 
+class ProgressiveSegment(Segment):
+    def __init__(self, startByte=0, endByte=0, dlCost=0, chunks=[],
+                 milestones=[], arrivals=[], dlTime=None, arrivalTimes=None):
+        super(ProgressiveSegment, self).__init__(startByte, endByte, dlCost,
+                                                 chunks, dlTime)
+
+        self.milestones = milestones
+
+        # (milestone, dlCost) pairs during the search, with the matching
+        # (milestone, time) pairs filled in by timed()
+        self.arrivals = arrivals
+        self.arrivalTimes = arrivalTimes
+
+    def arrivalsAfter(self, chunk, dlCost):
+        # a milestone arrives with the chunk that first carries the segment
+        # past it, since downloads are sequential
+        arrivals = list(self.arrivals)
+
+        for milestone in self.milestones[len(arrivals):]:
+            if (milestone > chunk.end()):
+                break
+
+            arrivals.append((milestone, dlCost))
+
+        return arrivals
+
+    def extend(segment, chunk, dlCost):
+        extendedSegment = Segment.extend(segment, chunk, dlCost)
+
+        return ProgressiveSegment(extendedSegment.start(), extendedSegment.end(),
+                                  extendedSegment.dlCost, extendedSegment.chunks,
+                                  segment.milestones,
+                                  segment.arrivalsAfter(chunk, extendedSegment.dlCost))
+
+    def timed(self, connInfo):
+        return ProgressiveSegment(
+            self.start(), self.end(), self.dlCost, self.chunks, self.milestones,
+            self.arrivals, connInfo.dlCostToTime(self.dlCost),
+            [(milestone, connInfo.dlCostToTime(arrival))
+             for (milestone, arrival) in self.arrivals]
+        )
+
 class ImageFactory(object):
+    _DEFAULT_ENGINE_ = 'exhaustive'
+    _ENGINES_ = {
+        'exhaustive': RoverImage,
+        'dynamic':    DynamicRoverImage,
+    }
+
+    def engineNames():
+        return sorted(ImageFactory._ENGINES_.keys())
+
+    def roverImage(chunks, engine=None):
+        engine = engine or ImageFactory._DEFAULT_ENGINE_
+
+        if (engine not in ImageFactory._ENGINES_):
+            raise ValueError('unknown solver engine [%s]' % engine)
+
+        return ImageFactory._ENGINES_[engine](chunks)
+
     def imageChunksFromStdIn(connInfo):
+        return ImageFactory.sortChunks(ImageFactory.rawChunksFromStdIn(connInfo))
+
+    def rawChunksFromStdIn(connInfo):
         chunks = []
 
         for chunkNum in range(connInfo.numChunks()):
             (startByte, endByte) = str(input()).split(',')
             chunks.append(Chunk(int(startByte), int(endByte)))
 
+        return chunks
+
+    def sortChunks(chunks):
         return sorted(sorted(chunks, key=lambda chunk: chunk.end()),
                       key=lambda chunk: chunk.start())
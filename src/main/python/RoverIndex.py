@@ -0,0 +1,236 @@
+import struct
+
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+
+from RoverConnection import CostModel
+
+class RangeCostIndex(object):
+    '''
+    answers "what is the cheapest way to fetch bytes [a, b]?" for a fixed chunk
+    list and connection. Any cover of [a, b] must start with a chunk that
+    starts at or before a and finish with one that ends at or after b, so the
+    answer only depends on the nearest chunk start before a and the nearest
+    chunk end after b. Those pairs are priced once up front and every query is
+    two binary searches and a table lookup. The table holds the exact integer
+    costs from ConnInfo.getDlCosts, along with the scale that turns them back
+    into times.
+
+    The table is dense, one cost per (distinct start, distinct end) pair, so
+    an index over n chunks holds up to n^2 costs. They are stored in binary,
+    in 4 bytes each when every cost fits and 8 otherwise: at most 4 MB for
+    1000 chunks, but 400 MB for 10000. Building it takes
+    O(n log n) per distinct start, O(n^2 log n) in all, so an index is meant
+    for the chunks of one image rather than a whole catalog
+    '''
+    _MAGIC_          = b'RVRIDX01'
+    _FORMAT_VERSION_ = 1
+    _HEADER_         = struct.Struct('<QqQQc')
+
+    # struct formats for costs, narrowest first
+    _COST_FORMATS_ = (b'i', b'q')
+
+    # unreachable pairs are stored as -1, costs themselves are never negative
+    _NO_COST_ = -1
+
+    def __init__(self, dlCostScale, starts, ends, costTable):
+        self.dlCostScale = dlCostScale
+        self.starts = starts
+        self.ends = ends
+
+        # row major, one row of len(ends) costs per start
+        self.costTable = costTable
+
+    def fromChunks(chunks, connInfo):
+        sortedChunks = sorted([chunk for chunk in chunks if chunk.size() > 0],
+                              key=lambda chunk: chunk.end())
+        dlCosts = list(zip(sortedChunks, connInfo.getDlCosts(sortedChunks)))
+
+        starts = sorted(set(chunk.start() for (chunk, dlCost) in dlCosts))
+        ends = sorted(set(chunk.end() for (chunk, dlCost) in dlCosts))
+
+        # the ends each chunk can extend from, [startNdx, endNdx), are the same
+        # for every row
+        endRanges = [(bisect_left(ends, chunk.start()), bisect_left(ends, chunk.end()))
+                     for (chunk, dlCost) in dlCosts]
+
+        costTable = array('q')
+        for startByte in starts:
+            costTable.extend(RangeCostIndex.costsFromStart(startByte, dlCosts,
+                                                           endRanges, len(ends)))
+
+        return RangeCostIndex(connInfo.dlCostScale(), starts, ends, costTable)
+
+    def costsFromStart(startByte, dlCosts, endRanges, numEnds):
+        # cheapest chain covering [startByte, end] for each reachable end, with
+        # chunks visited in order of their end byte. The cheapest chain a chunk
+        # can extend is a range minimum over the ends it overlaps
+        endCosts = MinTree(numEnds)
+
+        for ((chunk, dlCost), (startNdx, endNdx)) in zip(dlCosts, endRanges):
+            if (chunk.end() <= startByte):
+                continue
+
+            if (chunk.start() <= startByte):
+                chunkCost = dlCost
+            else:
+                prefixCost = endCosts.min(startNdx, endNdx)
+
+                if (prefixCost is None):
+                    continue
+
+                chunkCost = prefixCost + dlCost
+
+            endCosts.lower(endNdx, chunkCost)
+
+        # a chain that runs past the end of the query is still a valid cover,
+        # so each end is priced at the cheapest chain reaching at least as far
+        costs = [RangeCostIndex._NO_COST_] * numEnds
+        cheapestCost = None
+
+        for endNdx in range(numEnds - 1, -1, -1):
+            endCost = endCosts.at(endNdx)
+
+            if (endCost is not None and
+                (cheapestCost is None or endCost < cheapestCost)):
+                cheapestCost = endCost
+
+            if (cheapestCost is not None):
+                costs[endNdx] = cheapestCost
+
+        return costs
+
+    def cost(self, startByte, endByte):
+        dlCost = self.dlCost(startByte, endByte)
+
+        if (dlCost is None):
+            return None
+
+        return CostModel.scaledToTime(dlCost, self.dlCostScale)
+
+    def dlCost(self, startByte, endByte):
+        if (startByte >= endByte):
+            raise ValueError('byte range [%d, %d] is empty' % (startByte, endByte))
+
+        startNdx = bisect_right(self.starts, startByte) - 1
+        endNdx = bisect_left(self.ends, endByte)
+
+        if (startNdx < 0 or endNdx == len(self.ends)):
+            return None
+
+        dlCost = self.costTable[startNdx * len(self.ends) + endNdx]
+
+        if (dlCost == RangeCostIndex._NO_COST_):
+            return None
+
+        return dlCost
+
+    def costs(self, byteRanges):
+        return [self.cost(startByte, endByte) for (startByte, endByte) in byteRanges]
+
+    def toBytes(self):
+        costFormat = RangeCostIndex.costFormat(self.costTable)
+        bounds = self.starts + self.ends
+
+        return (RangeCostIndex._MAGIC_ +
+                RangeCostIndex._HEADER_.pack(RangeCostIndex._FORMAT_VERSION_,
+                                             self.dlCostScale, len(self.starts),
+                                             len(self.ends), costFormat) +
+                struct.pack('<%dq' % len(bounds), *bounds) +
+                struct.pack('<%d%s' % (len(self.costTable), costFormat.decode()),
+                            *self.costTable))
+
+    def costFormat(costTable):
+        for costFormat in RangeCostIndex._COST_FORMATS_:
+            costBits = 8 * struct.calcsize(costFormat.decode())
+
+            if (all(dlCost < 2 ** (costBits - 1) for dlCost in costTable)):
+                return costFormat
+
+        raise ValueError('index costs do not fit in 64 bits')
+
+    def fromBytes(indexBytes):
+        magicSize = len(RangeCostIndex._MAGIC_)
+        headerSize = magicSize + RangeCostIndex._HEADER_.size
+
+        if (indexBytes[:magicSize] != RangeCostIndex._MAGIC_ or
+            len(indexBytes) < headerSize):
+            raise ValueError('not a range cost index')
+
+        (version, dlCostScale, numStarts, numEnds, costFormat) = \
+            RangeCostIndex._HEADER_.unpack_from(indexBytes, magicSize)
+
+        if (version != RangeCostIndex._FORMAT_VERSION_):
+            raise ValueError('unsupported index version [%s]' % version)
+
+        if (costFormat not in RangeCostIndex._COST_FORMATS_):
+            raise ValueError('unsupported index cost format [%s]' % costFormat)
+
+        numBounds = numStarts + numEnds
+        boundsFormat = '<%dq' % numBounds
+        costsFormat = '<%d%s' % (numStarts * numEnds, costFormat.decode())
+
+        if (len(indexBytes) != (headerSize + struct.calcsize(boundsFormat) +
+                                struct.calcsize(costsFormat))):
+            raise ValueError('range cost index is truncated')
+
+        bounds = struct.unpack_from(boundsFormat, indexBytes, headerSize)
+        costTable = array('q', struct.unpack_from(
+            costsFormat, indexBytes, headerSize + struct.calcsize(boundsFormat)
+        ))
+
+        return RangeCostIndex(dlCostScale, list(bounds[:numStarts]),
+                              list(bounds[numStarts:]), costTable)
+
+    def dump(self, indexFile):
+        # indexFile has to be opened in binary mode
+        indexFile.write(self.toBytes())
+
+    def load(indexFile):
+        return RangeCostIndex.fromBytes(indexFile.read())
+
+class MinTree(object):
+    '''
+    a segment tree of costs, where a cost can only ever be lowered, answering
+    the cheapest cost over a range of positions in O(log n)
+    '''
+    def __init__(self, size):
+        self.size = size
+        self.nodes = [None] * (2 * size)
+
+    def at(self, position):
+        return self.nodes[self.size + position]
+
+    def lower(self, position, cost):
+        nodeNdx = self.size + position
+
+        while (nodeNdx > 0 and
+               (self.nodes[nodeNdx] is None or cost < self.nodes[nodeNdx])):
+            self.nodes[nodeNdx] = cost
+            nodeNdx //= 2
+
+    def min(self, startPosition, endPosition):
+        # the cheapest cost in [startPosition, endPosition), None if there are
+        # none
+        (startNdx, endNdx) = (startPosition + self.size, endPosition + self.size)
+        cheapestCost = None
+
+        while (startNdx < endNdx):
+            if (startNdx % 2 == 1):
+                cheapestCost = MinTree.cheaper(cheapestCost, self.nodes[startNdx])
+                startNdx += 1
+
+            if (endNdx % 2 == 1):
+                endNdx -= 1
+                cheapestCost = MinTree.cheaper(cheapestCost, self.nodes[endNdx])
+
+            (startNdx, endNdx) = (startNdx // 2, endNdx // 2)
+
+        return cheapestCost
+
+    def cheaper(cost, otherCost):
+        if (cost is None or (otherCost is not None and otherCost < cost)):
+            return otherCost
+
+        return cost
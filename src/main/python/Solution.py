@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 
@@ -5,6 +6,9 @@ from RoverConnection import ConnectionFactory
 from RoverImage import ImageFactory
 
 from RoverImage import RoverImage
+from RoverImage import BeamRoverImage
+from RoverImage import DynamicRoverImage
+from RoverImage import ProgressiveRoverImage
 from RoverImage import Chunk
 from RoverImage import Segment
 
@@ -15,15 +19,56 @@ class Solver(object):
     _DEFAULT_INPUT_SUFFIX_ = '.input'
 
     def parseInput():
+        (connInfo, rawChunks) = Solver.readInput()
+        return (connInfo, Solver.sortInput(rawChunks))
+
+    # parseInput is split into its read and sort steps so that the profiler
+    # times the same steps a plain solve runs
+    def readInput():
         connInfo = ConnectionFactory.connInfoFromStdIn()
-        imageChunks = ImageFactory.imageChunksFromStdIn(connInfo)
+        return (connInfo, ImageFactory.rawChunksFromStdIn(connInfo))
+
+    def sortInput(rawChunks):
+        return ImageFactory.sortChunks(rawChunks)
+
+    def solveFromStdIn(engine=None, profiler=None, inputName='stdin'):
+        # the profiler is only touched when one is given, so the plain solve
+        # pays nothing for profiling support
+        if (profiler is not None):
+            return profiler.solveFromStdIn(inputName, engine)
+
+        (connInfo, imageChunks) = Solver.parseInput()
+        return Solver.getOptimalImageSegment(connInfo, imageChunks, engine)
+
+    def getOptimalImageSegment(connInfo, imageChunks, engine=None):
+        roverImage = ImageFactory.roverImage(imageChunks, engine)
+        return roverImage.getOptimalImageSegment(connInfo)
+
+    def getBeamImageSegment(connInfo, imageChunks, maxSegments=None, maxBytes=None):
+        # returns whether the segment is provably optimal alongside it
+        roverImage = BeamRoverImage(imageChunks, maxSegments, maxBytes)
+        optimalSegment = roverImage.getOptimalImageSegment(connInfo)
+
+        return (optimalSegment, roverImage.isOptimal())
 
-        return (connInfo, imageChunks)
+    def getCatalogImageSegment(connInfo, catalog, imageId, engine=None):
+        # catalog chunks are stored sorted, so there is nothing to parse or sort
+        return Solver.getOptimalImageSegment(connInfo, catalog.imageChunks(imageId),
+                                             engine)
 
-    def getOptimalImageSegment(connInfo, imageChunks):
-        roverImage = RoverImage(imageChunks)
+    def getProgressiveImageSegment(connInfo, imageChunks, milestones):
+        roverImage = ProgressiveRoverImage(imageChunks, milestones)
         return roverImage.getOptimalImageSegment(connInfo)
 
+    def getResumableImage(imageChunks):
+        return DynamicRoverImage(imageChunks)
+
+    def getResumeImageSegment(connInfo, roverImage, receivedRanges):
+        # pass the same engine, from getResumableImage, to every resume of a
+        # transfer so that its priced chunks and its search up to the first
+        # received byte are reused
+        return roverImage.getResumeImageSegment(connInfo, receivedRanges)
+
     def filesFromDir(inputDir, inputSuffix):
         inputFilePaths = []
 
@@ -52,13 +97,66 @@ class Solver(object):
         inputFilePaths = Solver.filesFromDir(inputDir, inputSuffix)
         return Solver.getValidPaths(inputFilePaths)
 
+    def parseArgs(argv):
+        parser = argparse.ArgumentParser(
+            description='find the fastest way to download a mars rover image'
+        )
+
+        parser.add_argument('--input', action='append', dest='inputPaths',
+                            help='input file to solve, may be repeated '
+                                 '(default: stdin)')
+        parser.add_argument('--engine', choices=ImageFactory.engineNames(),
+                            help='solver engine to use')
+        parser.add_argument('--profile', action='store_true',
+                            help='print the time spent in each phase to stderr')
+        parser.add_argument('--cprofile', action='store_true',
+                            help='write a pstats file per input (implies '
+                                 '--profile, whose times then include the '
+                                 'overhead of cProfile)')
+        parser.add_argument('--tracemalloc', action='store_true',
+                            help='write a memory report per input (implies '
+                                 '--profile, whose times then include the '
+                                 'overhead of tracemalloc)')
+        parser.add_argument('--report-dir', dest='reportDir',
+                            help='directory for profiling reports '
+                                 '(default: current directory)')
+
+        # unknown arguments are left alone so that debugPrint keeps working
+        (args, unknownArgs) = parser.parse_known_args(argv)
+        return args
+
+    def profilerFromArgs(args):
+        if (not (args.profile or args.cprofile or args.tracemalloc)):
+            return None
+
+        # cProfile and tracemalloc are only imported once profiling is on, so
+        # a plain run doesn't pay for them
+        from SolverProfile import PhaseProfiler
+
+        return PhaseProfiler(args.reportDir, args.cprofile, args.tracemalloc)
+
     def debugPrint(message):
         if ('debug' in sys.argv or 'DEBUG' in sys.argv):
             print(message)
 
 if __name__ == '__main__':
-    (connInfo, imageChunks) = Solver.parseInput()
-    optimalSegment = Solver.getOptimalImageSegment(connInfo, imageChunks)
+    args = Solver.parseArgs(sys.argv[1:])
+    profiler = Solver.profilerFromArgs(args)
+
+    for inputPath in (args.inputPaths or [None]):
+        inputName = 'stdin'
+
+        if (inputPath is not None):
+            inputName = os.path.splitext(os.path.basename(inputPath))[0]
+            sys.stdin = open(inputPath)
+
+        optimalSegment = Solver.solveFromStdIn(args.engine, profiler, inputName)
+
+        if (inputPath is not None):
+            sys.stdin.close()
+
+        if (optimalSegment is not None):
+            print(optimalSegment.dlTime)
 
-    if (optimalSegment is not None):
-        print(optimalSegment.dlTime)
+        if (profiler is not None):
+            print(profiler.phasesToStr(inputName), file=sys.stderr)
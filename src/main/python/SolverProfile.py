@@ -0,0 +1,97 @@
+import cProfile
+import os
+import tracemalloc
+
+from time import perf_counter_ns
+
+from Solution import Solver
+
+class PhaseProfiler(object):
+    '''
+    times the parse, sort and search phases of a solve. Optionally the solve
+    is also run under cProfile and tracemalloc, in which case a pstats file and
+    a memory report are written to the report directory for each input. Input
+    is read from stdin only once, so the phases are timed in that same run and
+    include the overhead of whichever of the two is active
+    '''
+    _PHASES_ = ('parse', 'sort', 'search')
+    _TOP_ALLOCATIONS_ = 10
+
+    def __init__(self, reportDir=None, useCProfile=False, useTracemalloc=False):
+        self.reportDir = reportDir or os.curdir
+        self.useCProfile = useCProfile
+        self.useTracemalloc = useTracemalloc
+
+        # phase timings in nanoseconds, keyed by input name
+        self.phaseTimes = {}
+
+    def solveFromStdIn(self, inputName, engine=None):
+        phaseTimes = {}
+        profiler = cProfile.Profile() if self.useCProfile else None
+
+        if (self.useTracemalloc):
+            tracemalloc.start()
+
+        if (profiler is not None):
+            profiler.enable()
+
+        try:
+            startTime = perf_counter_ns()
+            (connInfo, rawChunks) = Solver.readInput()
+            phaseTimes['parse'] = perf_counter_ns() - startTime
+
+            startTime = perf_counter_ns()
+            imageChunks = Solver.sortInput(rawChunks)
+            phaseTimes['sort'] = perf_counter_ns() - startTime
+
+            startTime = perf_counter_ns()
+            optimalSegment = Solver.getOptimalImageSegment(connInfo, imageChunks,
+                                                           engine)
+            phaseTimes['search'] = perf_counter_ns() - startTime
+
+        finally:
+            if (profiler is not None):
+                profiler.disable()
+
+            # stop tracing before any report is written so that the reports
+            # don't show up in the memory report
+            if (self.useTracemalloc):
+                (snapshot, tracedMemory) = (tracemalloc.take_snapshot(),
+                                            tracemalloc.get_traced_memory())
+                tracemalloc.stop()
+                self.writeMemoryReport(inputName, snapshot, tracedMemory)
+
+            if (profiler is not None):
+                profiler.dump_stats(self.reportPath(inputName, 'pstats'))
+
+        self.phaseTimes[inputName] = phaseTimes
+        return optimalSegment
+
+    def reportPath(self, inputName, suffix):
+        return os.path.join(self.reportDir, '%s.%s' % (inputName, suffix))
+
+    def writeMemoryReport(self, inputName, snapshot, tracedMemory):
+        (currentBytes, peakBytes) = tracedMemory
+
+        with open(self.reportPath(inputName, 'memory.txt'), 'w') as reportFile:
+            reportFile.write('current: %d bytes\n' % currentBytes)
+            reportFile.write('peak: %d bytes\n' % peakBytes)
+
+            for stat in snapshot.statistics('lineno')[:PhaseProfiler._TOP_ALLOCATIONS_]:
+                reportFile.write('%s\n' % stat)
+
+    def instrumentation(self):
+        return [name for (name, isUsed) in (('cProfile', self.useCProfile),
+                                            ('tracemalloc', self.useTracemalloc))
+                if isUsed]
+
+    def phasesToStr(self, inputName):
+        phaseTimes = self.phaseTimes[inputName]
+        phaseStrs = ['%s %s: %d ns' % (inputName, phase, phaseTimes[phase])
+                     for phase in PhaseProfiler._PHASES_]
+
+        if (len(self.instrumentation()) > 0):
+            phaseStrs.append('%s times include the overhead of %s' %
+                             (inputName, ' and '.join(self.instrumentation())))
+
+        return '\n'.join(phaseStrs)
@@ -0,0 +1,353 @@
+import unittest
+import random
+import time
+import tracemalloc
+
+from RoverConnection import ConnectionFactory
+from RoverConnection import ConnInfo
+from RoverConnection import TieredCostModel
+from RoverConnection import Tier
+
+from RoverImage import ImageFactory
+from RoverImage import BeamRoverImage
+from RoverImage import DynamicRoverImage
+from RoverImage import ProgressiveRoverImage
+from RoverImage import Chunk
+
+from RoverIndex import RangeCostIndex
+
+class Manifest(object):
+    def __init__(self, imageSize, latency, bandwidth, chunkBounds, costModel=None):
+        self.imageSize = imageSize
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.chunkBounds = list(chunkBounds)
+        self.costModel = costModel
+
+    def connInfo(self):
+        return ConnInfo(dict(zip(ConnectionFactory._CONTEXT_PARAMS_,
+                                 (self.imageSize, self.latency,
+                                  self.bandwidth, len(self.chunkBounds)))),
+                        self.costModel)
+
+    def imageChunks(self):
+        # mirror the ordering produced by ImageFactory.imageChunksFromStdIn
+        return [Chunk(start, end) for (start, end) in sorted(self.chunkBounds)]
+
+    def without(self, chunkNdx):
+        return Manifest(self.imageSize, self.latency, self.bandwidth,
+                        self.chunkBounds[:chunkNdx] +
+                        self.chunkBounds[chunkNdx + 1:], self.costModel)
+
+    def __str__(self):
+        return '\n'.join([str(self.imageSize), str(self.latency),
+                          str(self.bandwidth), str(len(self.chunkBounds))] +
+                         ['%d,%d' % bounds for bounds in self.chunkBounds])
+
+class ManifestFactory(object):
+    def fromSeed(seed, numChunks):
+        rng = random.Random(seed)
+        imageSize = rng.randint(1, 40) * 50
+        chunkBounds = []
+
+        # lay down one chain of chunks that covers the whole image so that
+        # every manifest has at least one solution
+        startByte = 0
+        while (startByte < imageSize and len(chunkBounds) < numChunks - 1):
+            endByte = rng.randint(startByte + 1, imageSize)
+            chunkBounds.append((startByte, endByte))
+            startByte = rng.randint(max(1, startByte), endByte)
+
+        chunkBounds.append((startByte, imageSize))
+
+        while (len(chunkBounds) < numChunks):
+            startByte = rng.randint(0, imageSize - 1)
+            chunkBounds.append((startByte, rng.randint(startByte + 1, imageSize)))
+
+        rng.shuffle(chunkBounds)
+        return Manifest(imageSize, rng.randint(0, 30), rng.randint(1, 20),
+                        chunkBounds)
+
+    def tieredFromSeed(seed, numChunks):
+        manifest = ManifestFactory.fromSeed(seed, numChunks)
+        rng = random.Random(-seed)
+
+        tiers = dict(('tier%d' % tierNdx,
+                      Tier(rng.randint(0, 30), rng.randint(1, 20),
+                           rng.choice([1, 1.1, 1.25, 2, '4/3'])))
+                     for tierNdx in range(3))
+        manifest.costModel = TieredCostModel(tiers, dict(
+            (bounds, rng.choice(sorted(tiers.keys())))
+            for bounds in manifest.chunkBounds
+        ))
+
+        return manifest
+
+class TestDifferentialFuzz(unittest.TestCase):
+    _NUM_SEEDS_ = 40
+
+    # wall clock seconds allowed per solve, keyed by number of chunks. these
+    # are deliberately loose so that only algorithmic regressions trip them
+    _TIME_BUDGETS_ = {
+        'exhaustive': {4: 0.05, 8: 0.25, 12: 2.0},
+        'dynamic':    {4: 0.01, 8: 0.02, 12: 0.05, 64: 0.5},
+    }
+
+    def solveAll(self, manifest, engines):
+        dlTimes = {}
+
+        for engine in engines:
+            segment = ImageFactory.roverImage(
+                manifest.imageChunks(), engine
+            ).getOptimalImageSegment(manifest.connInfo())
+
+            dlTimes[engine] = None if segment is None else (segment.dlCost,
+                                                            segment.dlTime)
+
+        return dlTimes
+
+    def isAgreement(self, dlTimes):
+        # costs are exact, so engines must agree to the last bit
+        return len(set(dlTimes.values())) <= 1
+
+    def shrink(self, manifest, isFailing):
+        # greedily drop chunks for as long as the manifest keeps failing
+        shrunk = True
+
+        while (shrunk):
+            shrunk = False
+
+            for chunkNdx in range(len(manifest.chunkBounds)):
+                candidate = manifest.without(chunkNdx)
+
+                if (isFailing(candidate)):
+                    manifest = candidate
+                    shrunk = True
+                    break
+
+        return manifest
+
+    def assertEnginesAgree(self, manifest, engines):
+        isFailing = lambda candidate: not self.isAgreement(
+            self.solveAll(candidate, engines)
+        )
+
+        if (isFailing(manifest)):
+            reproducer = self.shrink(manifest, isFailing)
+            self.fail('engines disagree %s on minimal manifest:\n%s' % (
+                self.solveAll(reproducer, engines), reproducer))
+
+    def testEnginesAgree(self):
+        engines = ImageFactory.engineNames()
+
+        for seed in range(TestDifferentialFuzz._NUM_SEEDS_):
+            for numChunks in (1, 4, 8, 12):
+                self.assertEnginesAgree(ManifestFactory.fromSeed(seed, numChunks),
+                                        engines)
+
+    def coverCost(self, manifest, startByte, endByte, receivedRanges=[]):
+        # prices every subset of chunks, which is only feasible for the small
+        # manifests used here but shares no logic with the engines
+        connInfo = manifest.connInfo()
+        chunks = manifest.imageChunks()
+        cheapestCost = None
+
+        for subsetMask in range(2 ** len(chunks)):
+            subset = [chunk for (chunkNdx, chunk) in enumerate(chunks)
+                      if subsetMask & (1 << chunkNdx)]
+            coveredByte = startByte
+
+            for chunk in sorted(subset + [Chunk(*receivedRange)
+                                          for receivedRange in receivedRanges],
+                                key=lambda chunk: chunk.start()):
+                if (chunk.start() <= coveredByte):
+                    coveredByte = max(coveredByte, chunk.end())
+
+            if (coveredByte >= endByte):
+                subsetCost = sum(connInfo.getDlCost(chunk) for chunk in subset)
+
+                if (cheapestCost is None or subsetCost < cheapestCost):
+                    cheapestCost = subsetCost
+
+        if (cheapestCost is None):
+            return None
+
+        return connInfo.dlCostToTime(cheapestCost)
+
+    def testEnginesAgreeOnTieredCosts(self):
+        engines = ImageFactory.engineNames()
+
+        for seed in range(TestDifferentialFuzz._NUM_SEEDS_):
+            manifest = ManifestFactory.tieredFromSeed(seed, 8)
+
+            self.assertEnginesAgree(manifest, engines)
+            self.assertEqual(self.solveAll(manifest, ['dynamic'])['dynamic'][1],
+                             self.coverCost(manifest, 0, manifest.imageSize))
+
+    def testBeamSearch(self):
+        for seed in range(TestDifferentialFuzz._NUM_SEEDS_):
+            manifest = ManifestFactory.fromSeed(seed, 12)
+            exactTime = self.solveAll(manifest, ['dynamic'])['dynamic'][1]
+
+            for maxSegments in (1, 2, 4, 64):
+                roverImage = BeamRoverImage(manifest.imageChunks(), maxSegments)
+                segment = roverImage.getOptimalImageSegment(manifest.connInfo())
+
+                if (roverImage.isOptimal()):
+                    self.assertEqual(segment.dlTime, exactTime)
+                elif (segment is not None):
+                    self.assertGreaterEqual(segment.dlTime, exactTime)
+
+    def testBeamFrontierStaysBounded(self):
+        frontierSizes = []
+
+        class RecordingBeamRoverImage(BeamRoverImage):
+            def checkForOptimalSegment(self, connInfo):
+                frontierSizes.append((len(self.segments),
+                                      sum(BeamRoverImage.segmentBytes(segment)
+                                          for segment in self.segments)))
+                super(RecordingBeamRoverImage, self).checkForOptimalSegment(connInfo)
+
+        # far too dense for the exhaustive engine
+        manifest = ManifestFactory.fromSeed(0, 80)
+        exactTime = self.solveAll(manifest, ['dynamic'])['dynamic'][1]
+
+        for (maxSegments, maxBytes) in ((8, None), (None, 20000)):
+            del frontierSizes[:]
+            roverImage = RecordingBeamRoverImage(manifest.imageChunks(),
+                                                 maxSegments, maxBytes)
+
+            startTime = time.perf_counter()
+            segment = roverImage.getOptimalImageSegment(manifest.connInfo())
+
+            self.assertLess(time.perf_counter() - startTime, 2.0)
+            for (numSegments, numBytes) in frontierSizes:
+                if (maxSegments is not None):
+                    self.assertLessEqual(numSegments, maxSegments)
+
+                if (maxBytes is not None):
+                    self.assertLessEqual(numBytes, maxBytes)
+
+            self.assertGreaterEqual(segment.dlTime, exactTime)
+
+    def testBeamPeakMemoryIsFlat(self):
+        # quadrupling the density of the manifest must not grow the peak
+        # memory of a byte budgeted beam
+        peakBytes = []
+
+        for numChunks in (80, 320):
+            manifest = ManifestFactory.fromSeed(1, numChunks)
+            (imageChunks, connInfo) = (manifest.imageChunks(), manifest.connInfo())
+
+            tracemalloc.start()
+            try:
+                BeamRoverImage(imageChunks, maxBytes=50000).getOptimalImageSegment(connInfo)
+                peakBytes.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+
+        self.assertLess(peakBytes[1], 1.5 * peakBytes[0])
+
+    def testBeamSkipsEmptyChunks(self):
+        manifest = Manifest(100, 5, 10, [(0, 0), (0, 60), (60, 100), (0, 100)])
+        roverImage = BeamRoverImage(manifest.imageChunks(), maxSegments=2)
+        segment = roverImage.getOptimalImageSegment(manifest.connInfo())
+
+        self.assertEqual(segment.dlTime, self.solveAll(manifest, ['dynamic'])['dynamic'][1])
+        self.assertTrue(roverImage.isOptimal())
+
+    def testRangeCostIndex(self):
+        for seed in range(TestDifferentialFuzz._NUM_SEEDS_):
+            rng = random.Random(seed)
+            manifest = ManifestFactory.fromSeed(seed, 8)
+            index = RangeCostIndex.fromChunks(manifest.imageChunks(),
+                                              manifest.connInfo())
+
+            self.assertEqual(index.cost(0, manifest.imageSize),
+                             self.solveAll(manifest, ['dynamic'])['dynamic'][1])
+
+            for queryNum in range(10):
+                startByte = rng.randint(0, manifest.imageSize - 1)
+                endByte = rng.randint(startByte + 1, manifest.imageSize)
+
+                self.assertEqual(index.cost(startByte, endByte),
+                                 self.coverCost(manifest, startByte, endByte))
+
+    def testResumeMatchesCoverCost(self):
+        for seed in range(TestDifferentialFuzz._NUM_SEEDS_):
+            rng = random.Random(seed)
+            manifest = ManifestFactory.fromSeed(seed, 8)
+            roverImage = DynamicRoverImage(manifest.imageChunks())
+
+            # half the engines resume off a finished cold search, the rest
+            # build it up one resume at a time
+            if (seed % 2 == 0):
+                roverImage.getOptimalImageSegment(manifest.connInfo())
+
+            for resumeNum in range(4):
+                receivedRanges = []
+                for rangeNum in range(rng.randint(0, 3)):
+                    startByte = rng.randint(0, manifest.imageSize - 1)
+                    receivedRanges.append((startByte,
+                                           rng.randint(startByte, manifest.imageSize)))
+
+                segment = roverImage.getResumeImageSegment(manifest.connInfo(),
+                                                           receivedRanges)
+
+                self.assertEqual(
+                    segment.dlTime,
+                    self.coverCost(manifest, 0, manifest.imageSize, receivedRanges)
+                )
+                self.assertEqual(
+                    segment.dlCost,
+                    sum(manifest.connInfo().getDlCost(chunk) for chunk in segment.chunks)
+                )
+
+    def testProgressiveFirstMilestone(self):
+        # the first milestone arrives as early as the cheapest cover of the
+        # bytes before it
+        manifests = [(Manifest(1000, 5, 10, [(0, 10), (0, 1000)]), 10)]
+
+        for seed in range(TestDifferentialFuzz._NUM_SEEDS_):
+            rng = random.Random(seed)
+            manifest = ManifestFactory.fromSeed(seed, 8)
+
+            # chunks at byte 0 can only be chained by the progressive objective
+            manifest.chunkBounds.append((0, rng.randint(1, manifest.imageSize)))
+            manifests.append((manifest, rng.randint(1, manifest.imageSize)))
+
+        for (manifest, milestone) in manifests:
+            segment = ProgressiveRoverImage(
+                manifest.imageChunks(), milestone
+            ).getOptimalImageSegment(manifest.connInfo())
+
+            self.assertEqual(segment.arrivalTimes[0][1],
+                             self.coverCost(manifest, 0, milestone))
+            self.assertEqual(segment.end(), manifest.imageSize)
+
+    def testShrinkFindsMinimalManifest(self):
+        # stands in for an engine that mishandles the full-image chunk whenever
+        # it isn't listed first
+        isFailing = lambda candidate: (
+            (0, 100) in candidate.chunkBounds and
+            candidate.chunkBounds[0] != (0, 100)
+        )
+
+        manifest = Manifest(100, 5, 10, [(20, 90), (0, 40), (40, 100), (0, 100)])
+        reproducer = self.shrink(manifest, isFailing)
+
+        self.assertEqual(len(reproducer.chunkBounds), 2)
+        self.assertTrue(isFailing(reproducer))
+
+    def testTimeBudgets(self):
+        for (engine, budgets) in TestDifferentialFuzz._TIME_BUDGETS_.items():
+            for (numChunks, budget) in sorted(budgets.items()):
+                manifest = ManifestFactory.fromSeed(numChunks, numChunks)
+                roverImage = ImageFactory.roverImage(manifest.imageChunks(), engine)
+
+                startTime = time.perf_counter()
+                roverImage.getOptimalImageSegment(manifest.connInfo())
+                elapsed = time.perf_counter() - startTime
+
+                self.assertLess(elapsed, budget, '%s took %.3fs on %d chunks' % (
+                    engine, elapsed, numChunks))
@@ -0,0 +1,142 @@
+import unittest
+import sys
+import os
+import tempfile
+
+from Solution import Solver
+
+from RoverCatalog import ChunkCatalog
+from RoverConnection import ConnectionFactory
+from RoverImage import ImageFactory
+from RoverImage import Chunk
+
+class TestRoverCatalog(unittest.TestCase):
+    _TEST_INPUT_FILE_ = 'src/unittest/resources/full.test.input'
+    _TEST_IMAGE_ID_   = 7
+    _OTHER_IMAGE_ID_  = 3
+
+    def setUp(self):
+        self.origStdIn = sys.stdin
+        sys.stdin = open(TestRoverCatalog._TEST_INPUT_FILE_)
+
+        self.connInfo = ConnectionFactory.connInfoFromStdIn()
+        self.rawChunks = ImageFactory.rawChunksFromStdIn(self.connInfo)
+
+        self.catalogDir = tempfile.TemporaryDirectory()
+        self.catalogPath = os.path.join(self.catalogDir.name, 'chunks.catalog')
+
+        ChunkCatalog.create(self.catalogPath, {
+            TestRoverCatalog._TEST_IMAGE_ID_:  self.rawChunks,
+            TestRoverCatalog._OTHER_IMAGE_ID_: [Chunk(0, 50), Chunk(0, 10)],
+        })
+
+    def tearDown(self):
+        assert self.origStdIn != sys.stdin
+
+        sys.stdin.close()
+        sys.stdin = self.origStdIn
+
+        self.catalogDir.cleanup()
+
+    def chunkBounds(self, chunks):
+        return [(chunk.start(), chunk.end()) for chunk in chunks]
+
+    def testImageChunks(self):
+        with ChunkCatalog.open(self.catalogPath) as catalog:
+            self.assertEqual(
+                self.chunkBounds(catalog.imageChunks(TestRoverCatalog._TEST_IMAGE_ID_)),
+                self.chunkBounds(ImageFactory.sortChunks(self.rawChunks))
+            )
+            self.assertEqual(
+                self.chunkBounds(catalog.imageChunks(TestRoverCatalog._OTHER_IMAGE_ID_)),
+                [(0, 10), (0, 50)]
+            )
+            self.assertEqual(catalog.imageChunks(5), [])
+            self.assertEqual(catalog.imageIds(), [3, 7])
+
+            segment = Solver.getCatalogImageSegment(
+                self.connInfo, catalog, TestRoverCatalog._TEST_IMAGE_ID_, 'dynamic'
+            )
+            self.assertEqual(segment.dlTime, 260.0)
+
+    def testAppendAndCompact(self):
+        oldCatalog = ChunkCatalog.open(self.catalogPath)
+
+        ChunkCatalog.append(self.catalogPath, {
+            TestRoverCatalog._TEST_IMAGE_ID_: [Chunk(0, 2000), Chunk(300, 500)],
+        })
+
+        # readers that were already open keep seeing the catalog they opened
+        self.assertEqual(len(oldCatalog.imageChunks(TestRoverCatalog._TEST_IMAGE_ID_)),
+                         len(self.rawChunks))
+        oldCatalog.close()
+
+        expectedBounds = self.chunkBounds(ImageFactory.sortChunks(
+            self.rawChunks + [Chunk(0, 2000), Chunk(300, 500)]
+        ))
+
+        with ChunkCatalog.open(self.catalogPath) as catalog:
+            self.assertEqual(len(catalog.runs), 2)
+            self.assertEqual(
+                self.chunkBounds(catalog.imageChunks(TestRoverCatalog._TEST_IMAGE_ID_)),
+                expectedBounds
+            )
+
+        ChunkCatalog.compact(self.catalogPath)
+
+        with ChunkCatalog.open(self.catalogPath) as catalog:
+            self.assertEqual(len(catalog.runs), 1)
+            self.assertEqual(
+                self.chunkBounds(catalog.imageChunks(TestRoverCatalog._TEST_IMAGE_ID_)),
+                expectedBounds
+            )
+
+    def testIncompleteRunIgnored(self):
+        with open(self.catalogPath, 'ab') as catalogFile:
+            catalogFile.write(ChunkCatalog._RUN_HEADER_.pack(3))
+            catalogFile.write(ChunkCatalog._RECORD_.pack(7, 0, 1))
+
+        with ChunkCatalog.open(self.catalogPath) as catalog:
+            self.assertEqual(len(catalog.runs), 1)
+
+    def testAppendAfterIncompleteRun(self):
+        with open(self.catalogPath, 'ab') as catalogFile:
+            catalogFile.write(ChunkCatalog._RUN_HEADER_.pack(2))
+            catalogFile.write(ChunkCatalog._RECORD_.pack(2, 0, 1))
+
+        ChunkCatalog.append(self.catalogPath, {
+            2: [Chunk(5, 9)],
+            TestRoverCatalog._OTHER_IMAGE_ID_: [Chunk(0, 4)],
+        })
+
+        with ChunkCatalog.open(self.catalogPath) as catalog:
+            self.assertEqual(len(catalog.runs), 2)
+            self.assertEqual(self.chunkBounds(catalog.imageChunks(2)), [(5, 9)])
+            self.assertEqual(
+                self.chunkBounds(catalog.imageChunks(TestRoverCatalog._OTHER_IMAGE_ID_)),
+                [(0, 4), (0, 10), (0, 50)]
+            )
+
+    def testAppendToMissingCatalog(self):
+        missingPath = os.path.join(self.catalogDir.name, 'missing.catalog')
+        ChunkCatalog.append(missingPath, {2: [Chunk(5, 9)]})
+
+        with ChunkCatalog.open(missingPath) as catalog:
+            self.assertEqual(self.chunkBounds(catalog.imageChunks(2)), [(5, 9)])
+
+    def testNotACatalog(self):
+        with open(self.catalogPath, 'wb') as catalogFile:
+            catalogFile.write(b'2000\n5\n10\n7\n')
+
+        self.assertRaises(ValueError, ChunkCatalog.open, self.catalogPath)
+        self.assertRaises(ValueError, ChunkCatalog.append, self.catalogPath,
+                          {2: [Chunk(5, 9)]})
+
+        # mmap can't map an empty file at all
+        open(self.catalogPath, 'wb').close()
+
+        self.assertRaisesRegex(ValueError, 'not a chunk catalog',
+                               ChunkCatalog.open, self.catalogPath)
+        self.assertRaisesRegex(ValueError, 'not a chunk catalog',
+                               ChunkCatalog.append, self.catalogPath,
+                               {2: [Chunk(5, 9)]})
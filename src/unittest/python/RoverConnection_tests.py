@@ -2,6 +2,9 @@ import unittest
 import sys
 
 from RoverConnection import ConnectionFactory
+from RoverConnection import TieredCostModel
+from RoverConnection import Tier
+from RoverImage import Chunk
 
 class TestRoverConnection(unittest.TestCase):
     _TEST_INPUT_FILE_ = 'src/unittest/resources/connection.test.input'
@@ -28,3 +31,71 @@ class TestRoverConnection(unittest.TestCase):
         self.assertEqual(connInfo.latency(),   TestRoverConnection._TEST_LATENCY_)
         self.assertEqual(connInfo.bandwidth(), TestRoverConnection._TEST_BANDWIDTH_)
         self.assertEqual(connInfo.numChunks(), TestRoverConnection._TEST_NUM_CHUNKS_)
+
+    def testDlCost(self):
+        connInfo = ConnectionFactory.connInfoFromStdIn()
+        chunk = Chunk(0, 205)
+
+        # 2 * latency * bandwidth + size
+        self.assertEqual(connInfo.getDlCost(chunk), 505)
+        self.assertEqual(connInfo.getDlTime(chunk), 50.5)
+
+        # summing exact costs is independent of order, which summing the
+        # times is not
+        chunks = [Chunk(0, 1), Chunk(0, 2), Chunk(0, 7)]
+        self.assertEqual(connInfo.dlCostToTime(sum(connInfo.getDlCost(chunk)
+                                                   for chunk in chunks)),
+                         connInfo.dlCostToTime(sum(connInfo.getDlCost(chunk)
+                                                   for chunk in reversed(chunks))))
+
+    def testTieredCosts(self):
+        tiers = {
+            'flash': Tier(latency=5, bandwidth=10),
+            'disk':  Tier(latency=20, bandwidth=4, retryMultiplier=1.25),
+        }
+        costModel = TieredCostModel(tiers, {(0, 200): 'disk'}, 'flash')
+        connInfo = ConnectionFactory.connInfoFromStdIn(costModel)
+
+        # 1.25 * (2 * 20 + 200 / 4) and 2 * 5 + 200 / 10
+        self.assertEqual(connInfo.getDlTime(Chunk(0, 200)), 112.5)
+        self.assertEqual(connInfo.getDlTime(Chunk(200, 400)), 30.0)
+
+        # costs are integral over a scale shared by every tier
+        chunks = [Chunk(0, 200), Chunk(200, 400), Chunk(0, 1)]
+        self.assertEqual(connInfo.dlCostScale(), 80)
+        self.assertEqual(connInfo.getDlCosts(chunks),
+                         [connInfo.getDlCost(chunk) for chunk in chunks])
+        self.assertTrue(all(isinstance(dlCost, int)
+                            for dlCost in connInfo.getDlCosts(chunks)))
+
+        # tiers can also be looked up with a function
+        costModel = TieredCostModel(tiers, lambda chunk: 'disk')
+        self.assertEqual(costModel.getDlTime(Chunk(200, 400)), 112.5)
+
+    def testTierValidation(self):
+        self.assertRaises(ValueError, Tier, latency=5, bandwidth=0)
+        self.assertRaises(ValueError, Tier, latency=5, bandwidth=10,
+                          retryMultiplier=0.5)
+
+        # fractional latencies and bandwidths would make costs inexact
+        self.assertRaises(ValueError, Tier, latency=0.5, bandwidth=10)
+        self.assertRaises(ValueError, Tier, latency=5, bandwidth=2.5)
+
+        # whole floats are taken as ints
+        costModel = TieredCostModel({'flash': Tier(latency=5.0, bandwidth=10.0)},
+                                    lambda chunk: 'flash')
+        self.assertEqual(costModel.dlCostScale(), 10)
+        self.assertEqual(costModel.getDlCost(Chunk(0, 200)), 300)
+        self.assertIsInstance(costModel.getDlCost(Chunk(0, 200)), int)
+
+        tiers = {'flash': Tier(latency=5, bandwidth=10)}
+
+        # no default tier for chunks missing from the dict
+        costModel = TieredCostModel(tiers, {(0, 200): 'flash'})
+        self.assertEqual(costModel.getDlTime(Chunk(0, 200)), 30.0)
+        self.assertRaisesRegex(ValueError, r'\[200, 400\]',
+                               costModel.getDlCosts, [Chunk(0, 200), Chunk(200, 400)])
+
+        # a function naming a tier that doesn't exist
+        costModel = TieredCostModel(tiers, lambda chunk: 'tape')
+        self.assertRaisesRegex(ValueError, 'tape', costModel.getDlCost, Chunk(0, 200))
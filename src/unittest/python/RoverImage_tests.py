@@ -1,12 +1,30 @@
 import unittest
 import sys
 
+from Solution import Solver
+
 from RoverConnection import ConnectionFactory
 from RoverImage import ImageFactory
 from RoverImage import RoverImage
+from RoverImage import BeamRoverImage
+from RoverImage import DynamicRoverImage
+from RoverImage import ProgressiveRoverImage
 from RoverImage import Chunk
 from RoverImage import Segment
 
+class CountingRoverImage(DynamicRoverImage):
+    '''
+    counts the chunks relaxed by the dynamic search
+    '''
+    def __init__(self, chunks):
+        super(CountingRoverImage, self).__init__(chunks)
+        self.numRelaxed = 0
+
+    def cheapestPrefix(self, offsets, bestSegments, chunk, dlCost):
+        self.numRelaxed += 1
+        return super(CountingRoverImage, self).cheapestPrefix(offsets, bestSegments,
+                                                              chunk, dlCost)
+
 class TestRoverImage(unittest.TestCase):
     _TEST_INPUT_FILE_ = 'src/unittest/resources/full.test.input'
     _TEST_IMAGE_SIZE_ = 2000
@@ -100,18 +118,24 @@ class TestRoverImage(unittest.TestCase):
         chunkTwo   = Chunk(250, 500)
         chunkThree = Chunk(500, 800)
 
-        dlOne   = self.connInfo.getDlTime(chunkOne)
-        dlTwo   = self.connInfo.getDlTime(chunkTwo)
-        dlThree = self.connInfo.getDlTime(chunkThree)
+        dlOne   = self.connInfo.getDlCost(chunkOne)
+        dlTwo   = self.connInfo.getDlCost(chunkTwo)
+        dlThree = self.connInfo.getDlCost(chunkThree)
 
         segmentOne   = Segment()
         segmentTwo   = Segment.extend(segmentOne, chunkOne, dlOne)
         segmentThree = Segment.extend(segmentTwo, chunkTwo, dlTwo)
         segmentFour  = Segment.extend(segmentThree, chunkThree, dlThree)
 
-        self.assertEquals(segmentTwo.addTime(10),   dlOne + 10)
-        self.assertEquals(segmentThree.addTime(12), dlOne + dlTwo + 12)
-        self.assertEquals(segmentFour.addTime(6.7), dlOne + dlTwo + dlThree + 6.7)
+        self.assertEquals(segmentTwo.addCost(10),   dlOne + 10)
+        self.assertEquals(segmentThree.addCost(12), dlOne + dlTwo + 12)
+        self.assertEquals(segmentFour.addCost(7),   dlOne + dlTwo + dlThree + 7)
+
+        # times are only filled in for output
+        self.assertIsNone(segmentFour.dlTime)
+        self.assertEqual(segmentFour.timed(self.connInfo).dlTime,
+                         self.connInfo.dlCostToTime(dlOne + dlTwo + dlThree))
+        self.assertEqual(segmentFour.timed(self.connInfo).dlCost, segmentFour.dlCost)
 
         self.assertTrue(segmentOne.isDiscoverable(chunkOne))
         self.assertTrue(segmentThree.isDiscoverable(chunkThree))
@@ -127,3 +151,113 @@ class TestRoverImage(unittest.TestCase):
         segment = roverImage.getOptimalImageSegment(self.connInfo)
         if (segment is not None):
             print(segment.dlTime)
+
+    def testProgressiveReconstruction(self):
+        # the cheapest full plan walks the small chunks, but the large chunk
+        # delivers the first 1800 bytes sooner
+        segment = ProgressiveRoverImage(self.imageChunks, 1800
+                                        ).getOptimalImageSegment(self.connInfo)
+
+        self.assertEqual(str(segment), '[0, 1800],[1000, 2000]')
+        self.assertEqual(segment.arrivalTimes, [(1800, 190.0), (2000, 300.0)])
+        self.assertEqual(segment.dlTime, 300.0)
+
+        # earlier milestones take precedence over later ones, and the large
+        # chunk at byte 0 can still follow the small one
+        segment = ProgressiveRoverImage(self.imageChunks, [200, 1800]
+                                        ).getOptimalImageSegment(self.connInfo)
+
+        self.assertEqual(str(segment), '[0, 200],[0, 1800],[1000, 2000]')
+        self.assertEqual(segment.arrivalTimes, [(200, 30.0), (1800, 220.0),
+                                                (2000, 330.0)])
+        self.assertEqual(segment.dlTime, 330.0)
+
+        self.assertRaises(ValueError, ProgressiveRoverImage(
+            self.imageChunks, [2001]).getOptimalImageSegment, self.connInfo)
+
+        # a small chunk at byte 0 may be fetched ahead of a larger one
+        segment = ProgressiveRoverImage(
+            [Chunk(0, 10), Chunk(0, 2000)], 10
+        ).getOptimalImageSegment(self.connInfo)
+
+        self.assertEqual(str(segment), '[0, 10],[0, 2000]')
+        self.assertEqual(segment.arrivalTimes, [(10, 11.0), (2000, 221.0)])
+
+    def testResumeReconstruction(self):
+        roverImage = DynamicRoverImage(self.imageChunks)
+        self.assertEqual(roverImage.getOptimalImageSegment(self.connInfo).dlTime, 260.0)
+
+        # with most of the large chunk on the ground only the tail is missing
+        segment = roverImage.getResumeImageSegment(self.connInfo,
+                                                   [(0, 900), (850, 1000)])
+        self.assertEqual(str(segment), '[1000, 2000]')
+        self.assertEqual(segment.dlTime, 110.0)
+
+        # a gap inside the received ranges is filled by the cheapest chunk
+        segment = roverImage.getResumeImageSegment(self.connInfo,
+                                                   [(0, 300), (500, 2000)])
+        self.assertEqual(str(segment), '[200, 400],[400, 600]')
+        self.assertEqual(segment.dlTime, 60.0)
+
+        segment = roverImage.getResumeImageSegment(self.connInfo, [(0, 2000)])
+        self.assertEqual(str(segment), '')
+        self.assertEqual(segment.dlTime, 0)
+
+        # received bytes past the end of the image still count as received
+        segment = roverImage.getResumeImageSegment(self.connInfo,
+                                                   [(-10, 1000), (900, 2500)])
+        self.assertEqual(str(segment), '')
+        self.assertEqual(segment.dlTime, 0)
+
+    def testResumeReusesColdSearch(self):
+        roverImage = CountingRoverImage(self.imageChunks)
+
+        # chunks ending by the first received byte are relaxed once, for the
+        # cold search, and then only the chunks ending after it
+        segment = roverImage.getResumeImageSegment(self.connInfo, [(1000, 2000)])
+        self.assertEqual(str(segment),
+                         '[0, 200],[200, 400],[400, 600],[600, 800],[800, 1000]')
+        self.assertEqual(segment.dlTime, 150.0)
+        self.assertEqual(roverImage.numRelaxed, 7)
+        pricedChunks = roverImage.pricedChunks
+
+        roverImage.numRelaxed = 0
+        segment = roverImage.getResumeImageSegment(self.connInfo, [(1000, 2000)])
+        self.assertEqual(segment.dlTime, 150.0)
+        self.assertEqual(roverImage.numRelaxed, 2)
+        self.assertIs(roverImage.pricedChunks, pricedChunks)
+
+        # a solve finishes the cold search, after which nothing that ends
+        # before the first received byte is relaxed again
+        self.assertEqual(roverImage.getOptimalImageSegment(self.connInfo).dlTime, 260.0)
+
+        roverImage.numRelaxed = 0
+        segment = Solver.getResumeImageSegment(self.connInfo, roverImage, [(0, 300)])
+        self.assertEqual(segment.dlTime, 230.0)
+        self.assertEqual(roverImage.numRelaxed, 7)
+
+        roverImage.numRelaxed = 0
+        segment = Solver.getResumeImageSegment(self.connInfo, roverImage, [(1800, 2000)])
+        self.assertEqual(segment.dlTime, 190.0)
+        self.assertEqual(roverImage.numRelaxed, 2)
+
+    def testBeamReconstruction(self):
+        roverImage = BeamRoverImage(self.imageChunks, maxSegments=16)
+        segment = roverImage.getOptimalImageSegment(self.connInfo)
+
+        self.assertEqual(segment.dlTime, 260.0)
+        self.assertTrue(roverImage.isOptimal())
+
+        # a single segment beam keeps the cheapest per byte, which is the
+        # large chunk, and drops the chain that would have been optimal
+        roverImage = BeamRoverImage(self.imageChunks, maxSegments=1)
+        segment = roverImage.getOptimalImageSegment(self.connInfo)
+
+        self.assertEqual(str(segment), '[0, 1800],[1000, 2000]')
+        self.assertFalse(roverImage.isOptimal())
+
+        roverImage = BeamRoverImage(self.imageChunks, maxBytes=0)
+        self.assertIsNone(roverImage.getOptimalImageSegment(self.connInfo))
+        self.assertFalse(roverImage.isOptimal())
+
+        self.assertRaises(ValueError, BeamRoverImage, self.imageChunks)
@@ -0,0 +1,88 @@
+import unittest
+import sys
+import io
+
+from RoverConnection import ConnectionFactory
+from RoverConnection import ConnInfo
+from RoverImage import ImageFactory
+from RoverImage import RoverImage
+from RoverImage import Chunk
+from RoverIndex import RangeCostIndex
+
+class TestRoverIndex(unittest.TestCase):
+    _TEST_INPUT_FILE_ = 'src/unittest/resources/full.test.input'
+
+    def setUp(self):
+        self.origStdIn = sys.stdin
+        sys.stdin = open(TestRoverIndex._TEST_INPUT_FILE_)
+
+        self.connInfo = ConnectionFactory.connInfoFromStdIn()
+        self.imageChunks = ImageFactory.imageChunksFromStdIn(self.connInfo)
+        self.index = RangeCostIndex.fromChunks(self.imageChunks, self.connInfo)
+
+    def tearDown(self):
+        assert self.origStdIn != sys.stdin
+
+        sys.stdin.close()
+        sys.stdin = self.origStdIn
+
+    def testFullImageCost(self):
+        segment = RoverImage(self.imageChunks).getOptimalImageSegment(self.connInfo)
+
+        self.assertEqual(self.index.cost(0, self.connInfo.imageSize()),
+                         segment.dlTime)
+
+    def testByteRangeCosts(self):
+        # a single chunk inside the image
+        self.assertEqual(self.index.cost(250, 350), 30.0)
+        self.assertEqual(self.index.cost(200, 400), 30.0)
+
+        # the large chunk only pays off when most of it is needed
+        self.assertEqual(self.index.cost(0, 1800), 190.0)
+        self.assertEqual(self.index.cost(150, 1000), 150.0)
+
+        # ranges that no chunk can reach
+        self.assertIsNone(self.index.cost(0, 2001))
+        self.assertIsNone(self.index.cost(-1, 10))
+
+        self.assertRaises(ValueError, self.index.cost, 10, 10)
+
+    def testBatchQueries(self):
+        byteRanges = [(250, 350), (0, 1800), (0, 2001)]
+
+        self.assertEqual(self.index.costs(byteRanges),
+                         [self.index.cost(*byteRange) for byteRange in byteRanges])
+
+    def testSerialization(self):
+        indexFile = io.BytesIO()
+        self.index.dump(indexFile)
+        indexFile.seek(0)
+
+        loadedIndex = RangeCostIndex.load(indexFile)
+        byteRanges = [(0, 2000), (250, 350), (150, 1000), (0, 2001)]
+
+        self.assertEqual(loadedIndex.costs(byteRanges), self.index.costs(byteRanges))
+
+        # small costs are stored in 4 bytes each
+        indexBytes = self.index.toBytes()
+        numCosts = len(self.index.starts) * len(self.index.ends)
+        self.assertLess(len(indexBytes), 8 * numCosts)
+
+        # other versions, truncated files and other files are all rejected
+        versionBytes = bytearray(indexBytes)
+        versionBytes[len(RangeCostIndex._MAGIC_)] = 0
+        self.assertRaises(ValueError, RangeCostIndex.fromBytes, bytes(versionBytes))
+        self.assertRaises(ValueError, RangeCostIndex.fromBytes, indexBytes[:-1])
+        self.assertRaises(ValueError, RangeCostIndex.fromBytes, b'{"version": 1}')
+
+    def testLargeCosts(self):
+        # costs past 32 bits fall back to 8 bytes each
+        connInfo = ConnInfo({'numBytes': 2 ** 40, 'latency': 1, 'bandwidth': 1,
+                             'numChunks': 2})
+        index = RangeCostIndex.fromChunks([Chunk(0, 2 ** 40), Chunk(0, 10)],
+                                          connInfo)
+        self.assertEqual(RangeCostIndex.costFormat(index.costTable), b'q')
+
+        loadedIndex = RangeCostIndex.fromBytes(index.toBytes())
+        self.assertEqual(loadedIndex.dlCost(0, 2 ** 40), 2 ** 40 + 2)
+        self.assertEqual(loadedIndex.dlCost(0, 5), 12)
@@ -0,0 +1,83 @@
+import unittest
+import sys
+import os
+import pstats
+import subprocess
+import tempfile
+
+from Solution import Solver
+from SolverProfile import PhaseProfiler
+
+class TestSolverProfile(unittest.TestCase):
+    _TEST_INPUT_FILE_ = 'src/unittest/resources/full.test.input'
+    _TEST_DL_TIME_    = 260.0
+
+    def setUp(self):
+        self.origStdIn = sys.stdin
+        sys.stdin = open(TestSolverProfile._TEST_INPUT_FILE_)
+
+        self.reportDir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        assert self.origStdIn != sys.stdin
+
+        sys.stdin.close()
+        sys.stdin = self.origStdIn
+
+        self.reportDir.cleanup()
+
+    def testPhaseTimes(self):
+        profiler = PhaseProfiler(self.reportDir.name)
+        segment = Solver.solveFromStdIn(profiler=profiler, inputName='full')
+
+        self.assertEqual(segment.dlTime, TestSolverProfile._TEST_DL_TIME_)
+        self.assertEqual(sorted(profiler.phaseTimes['full'].keys()),
+                         sorted(PhaseProfiler._PHASES_))
+        self.assertIn('full search:', profiler.phasesToStr('full'))
+        self.assertNotIn('overhead', profiler.phasesToStr('full'))
+
+        # nothing is written unless cProfile or tracemalloc were asked for
+        self.assertEqual(os.listdir(self.reportDir.name), [])
+
+    def testReports(self):
+        profiler = PhaseProfiler(self.reportDir.name, useCProfile=True,
+                                 useTracemalloc=True)
+        segment = Solver.solveFromStdIn('dynamic', profiler, 'full')
+
+        self.assertEqual(segment.dlTime, TestSolverProfile._TEST_DL_TIME_)
+
+        stats = pstats.Stats(profiler.reportPath('full', 'pstats'))
+        self.assertGreater(stats.total_calls, 0)
+
+        with open(profiler.reportPath('full', 'memory.txt')) as reportFile:
+            self.assertTrue(reportFile.readline().startswith('current: '))
+            self.assertTrue(reportFile.readline().startswith('peak: '))
+
+        # the phase times were taken under both profilers
+        self.assertIn('full times include the overhead of cProfile and tracemalloc',
+                      profiler.phasesToStr('full'))
+
+    def testProfilingDisabled(self):
+        args = Solver.parseArgs(['debug'])
+
+        self.assertIsNone(Solver.profilerFromArgs(args))
+        self.assertEqual(Solver.solveFromStdIn(args.engine).dlTime,
+                         TestSolverProfile._TEST_DL_TIME_)
+
+        # a plain run must not load the profiling modules at all
+        checkImports = subprocess.run(
+            [sys.executable, '-c',
+             'import sys; import Solution; '
+             'print("SolverProfile" in sys.modules, "cProfile" in sys.modules)'],
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+            capture_output=True, text=True, check=True
+        )
+        self.assertEqual(checkImports.stdout.split(), ['False', 'False'])
+
+        args = Solver.parseArgs(['--tracemalloc', '--report-dir',
+                                 self.reportDir.name])
+        profiler = Solver.profilerFromArgs(args)
+
+        self.assertTrue(profiler.useTracemalloc)
+        self.assertFalse(profiler.useCProfile)
+        self.assertEqual(profiler.reportDir, self.reportDir.name)
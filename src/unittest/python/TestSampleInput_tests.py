@@ -12,12 +12,27 @@ from RoverImage import Chunk
 from RoverImage import Segment
 
 class TestSampleInput(unittest.TestCase):
+    _SOLUTION_DIR_ = 'solutions'
+
     def setUp(self):
         self.origStdIn = sys.stdin
 
     def tearDown(self):
         sys.stdin = self.origStdIn
 
+    def expectedDlTime(self, filePath):
+        # solutions share the basename of their input, though not always the
+        # suffix
+        inputName = os.path.splitext(os.path.basename(filePath))[0]
+
+        for fileName in os.listdir(TestSampleInput._SOLUTION_DIR_):
+            if (os.path.splitext(fileName)[0] == inputName):
+                with open(os.path.join(TestSampleInput._SOLUTION_DIR_,
+                                       fileName)) as solutionFile:
+                    return float(solutionFile.read())
+
+        return None
+
     def testInputOne(self):
         for filePath in Solver.getInputFiles():
             Solver.debugPrint('opening file [%s]...' % filePath)
@@ -37,3 +52,21 @@ class TestSampleInput(unittest.TestCase):
 
             sys.stdin.close()
             Solver.debugPrint('closed file [%s]...' % filePath)
+
+    def testSolutionsForEveryEngine(self):
+        for filePath in Solver.getInputFiles():
+            expectedDlTime = self.expectedDlTime(filePath)
+            self.assertIsNotNone(expectedDlTime, 'no solution for [%s]' % filePath)
+
+            for engine in ImageFactory.engineNames():
+                sys.stdin = open(filePath)
+                (connInfo, imageChunks) = Solver.parseInput()
+                sys.stdin.close()
+
+                optimalSegment = Solver.getOptimalImageSegment(connInfo,
+                                                               imageChunks,
+                                                               engine)
+
+                self.assertIsNotNone(optimalSegment)
+                self.assertAlmostEqual(optimalSegment.dlTime, expectedDlTime,
+                                       places=3, msg='%s on [%s]' % (engine, filePath))